@@ -53,13 +53,53 @@
 # are set. It's debatable that someone would want those printed anyway; if  #
 # so, change draw() accordingly.                                            #
 #                                                                           #
+# If auto_justify or width_percentile is set, per-column statistics (cell   #
+# count, numeric cell count, and a histogram of cell widths) are gathered   #
+# as rows are added; the header is excluded. draw() uses them for an        #
+# optional auto-layout pass:                                                #
+#                                                                           #
+#     auto_justify        right-justify columns whose non-empty cells are   #
+#                         all numeric, unless set_col_property() already    #
+#                         set 'justify' for that column                     #
+#     width_percentile    cap each column at this percentile of its cell    #
+#                         widths (e.g., 95); 0 disables                     #
+#     max_width           cap the whole table at this many characters by    #
+#                         shrinking the widest columns; 'auto' uses the     #
+#                         terminal width; 0 disables                        #
+#     overflow            what to do with cells wider than their column's   #
+#                         cap: 'truncate' (default) or 'wrap'               #
+#                                                                           #
+# Headers are never truncated, so a column is never capped narrower than    #
+# its header. Columns that auto_justify finds to be numeric are not capped  #
+# by width_percentile, and max_width narrows them only after every other    #
+# column is as narrow as it can be.                                         #
+#                                                                           #
+# add_row() is not thread-safe. Producer threads sharing one table should   #
+# call add_row_concurrent(row, props, key) instead, which appends to a      #
+# buffer private to the calling thread. draw() merges those buffers in      #
+# order of key, then order of arrival for equal (or missing) keys, after    #
+# any rows already added with add_row(). Column widths and statistics are   #
+# computed during the merge. Call draw() once the producers have finished;  #
+# rows buffered after that are merged, in key order, by the next draw().    #
+#                                                                           #
 #---------------------------------------------------------------------------#
 
+import itertools
+import os
+import re
 import sys
+import textwrap
+import threading
 
 # Default column properties.
 DEF_COL_PROP_JUSTIFY = 'left'
 
+# Numbers as float() accepts them, minus 'nan' and 'inf'; i.e., '42',
+# '-3.5', '.5', '1e6'.
+RE_NUMBER = re.compile(r'^\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$')
+# Numbers with thousands separators; i.e., '1,024', '-12,345.67'.
+RE_THOUSANDS = re.compile(r'^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$')
+
 #---------------------------------------------------------------------------#
 # ConsoleTable                                                              #
 #---------------------------------------------------------------------------#
@@ -99,7 +139,12 @@ class ConsoleTable(object):
                  connector='+',
                  no_borders=False,
                  # No-borders padding
-                 nb_pad=' '):
+                 nb_pad=' ',
+                 # Auto-layout; see the notes at the top of this file.
+                 auto_justify=False,
+                 width_percentile=0,
+                 max_width=0,
+                 overflow='truncate'):
         '''The line-drawing arguments in this constructor only apply to
         ASCII tables, not utf8. rpad and lpad apply to both.
         '''
@@ -107,6 +152,12 @@ class ConsoleTable(object):
         self.rows_props = []
         self.cols_max_width = [0]
         self.cols_props = []
+        self.cols_stats = []
+        # Per-thread buffers for add_row_concurrent().
+        self.__local = threading.local()
+        self.__buffers = []
+        self.__buffers_lock = threading.Lock()
+        self.__arrival = itertools.count()
         self.last_col_idx = 0
         self.width = 0
         self.no_borders = no_borders
@@ -134,6 +185,44 @@ class ConsoleTable(object):
                 '\' for tjustify in constructor.\n')
             sys.exit(1)
         self.tjustify = tjustify
+        # columnate's --properties only converts 'true' and 'false', so
+        # anything else arrives here as a (truthy) string.
+        if auto_justify not in (True, False):
+            sys.stderr.write('ConsoleTable: Invalid value \'' +
+                str(auto_justify) + '\' for auto_justify in constructor.\n')
+            sys.exit(1)
+        self.auto_justify = auto_justify
+        # width_percentile and max_width may arrive as strings from
+        # columnate's --properties. 0 disables width_percentile;
+        # anything else must be 1-100.
+        try:
+            self.width_percentile = int(width_percentile)
+        except (TypeError, ValueError):
+            self.width_percentile = -1
+        if not 0 <= self.width_percentile <= 100:
+            sys.stderr.write('ConsoleTable: Invalid value \'' +
+                str(width_percentile) +
+                '\' for width_percentile in constructor.\n')
+            sys.exit(1)
+        if max_width == 'auto':
+            self.max_width = self.__terminal_width()
+        else:
+            try:
+                self.max_width = int(max_width)
+            except (TypeError, ValueError):
+                self.max_width = -1
+            if self.max_width < 0:
+                sys.stderr.write('ConsoleTable: Invalid value \'' +
+                    str(max_width) + '\' for max_width in constructor.\n')
+                sys.exit(1)
+        if overflow not in ('truncate', 'wrap'):
+            sys.stderr.write('ConsoleTable: Invalid value \'' + overflow +
+                '\' for overflow in constructor.\n')
+            sys.exit(1)
+        self.overflow = overflow
+        # max_width needs no statistics, so skip them in __add_row()
+        # unless an option will use them.
+        self.collect_stats = bool(self.auto_justify or self.width_percentile)
         if not no_borders and self.hjustify not in ('left', 'right', 'center'):
             sys.stderr.write('ConsoleTable: Invalid value \'' + 
                 self.hjustify + '\' for hjustify in constructor.\n')
@@ -215,6 +304,8 @@ class ConsoleTable(object):
             self.sw_dbl_connector = connector
             self.se_dbl_connector = connector
             self.s_dbl_connector = connector
+        # Marks the end of a truncated cell.
+        self.ellipsis = u'\u2026' if utf8 else u'~'  # …
         if header:
             self.add_header(header)
 
@@ -240,6 +331,25 @@ class ConsoleTable(object):
     def add_row(self, row, props=None):
         self.__add_row(row, props, False)
 
+    #-----------------------------------------------------------------------#
+    # add_row_concurrent                                                    #
+    #-----------------------------------------------------------------------#
+    def add_row_concurrent(self, row, props=None, key=None):
+        '''Thread-safe add_row() for multiple producer threads.
+
+        The row is appended to a buffer owned by the calling thread, so
+        producers never wait on each other; the lock is only taken the
+        first time a thread adds a row. Buffered rows are merged into the
+        table, sorted by key, when draw() is called.
+        '''
+        buf = getattr(self.__local, 'rows', None)
+        if buf is None:
+            buf = self.__local.rows = []
+            with self.__buffers_lock:
+                self.__buffers.append(buf)
+        # itertools.count() is atomic under the GIL.
+        buf.append((key, next(self.__arrival), list(row), props))
+
     #-----------------------------------------------------------------------#
     # add_line_separator                                                    #
     #-----------------------------------------------------------------------#
@@ -274,6 +384,7 @@ class ConsoleTable(object):
     def draw(self):
         '''Having collected all the data for this table, draw it.'''
         table = ''
+        self.__merge_concurrent_rows()
         # Check for empty data sets.  There are four checks because of 
         # the difference between:
         #   # This creates one empty row because of the newline.
@@ -291,6 +402,7 @@ class ConsoleTable(object):
         self.__pad_columns()
         self.__compute_last_col_idx()
         self.__set_default_col_props()
+        self.__cap_col_widths()
         self.__compute_width()
         # If line_separators are on, there may be an extra one at
         # the end of self.rows; remove it.
@@ -363,7 +475,8 @@ class ConsoleTable(object):
         '''Add a row one column at a time.
 
         If the width of any column is a new maximum width for that column, 
-        record it in self.cols_max_width.
+        record it in self.cols_max_width. Data (non-header) cells are also
+        counted in self.cols_stats for the auto-layout pass in draw().
         '''
         row_new = []
         row_new_multiline = []
@@ -383,6 +496,8 @@ class ConsoleTable(object):
                     self.cols_max_width[idx] = col_width
             except IndexError:
                 self.cols_max_width.append(col_width)
+            if self.collect_stats and not is_header:
+                self.__update_col_stats(idx, col, col_width)
         if is_header:
             self.rows.insert(0, row_new) 
             self.rows_props.insert(0, props)
@@ -397,6 +512,173 @@ class ConsoleTable(object):
             if self.line_separators and not is_header:
                 self.add_line_separator()
 
+    #-----------------------------------------------------------------------#
+    # __merge_concurrent_rows                                               #
+    #-----------------------------------------------------------------------#
+    def __merge_concurrent_rows(self):
+        '''Move rows buffered by add_row_concurrent() into the table.
+
+        Producers may still be appending while this runs. Each buffer is
+        only ever appended to, so removing the entries that were copied
+        leaves any newer ones in place for the next merge.
+        '''
+        entries = []
+        with self.__buffers_lock:
+            for buf in self.__buffers:
+                taken = buf[:]
+                del buf[:len(taken)]
+                entries.extend(taken)
+        entries.sort(key=lambda entry: entry[:2])
+        for key, arrival, row, props in entries:
+            self.__add_row(row, props, False)
+
+    #-----------------------------------------------------------------------#
+    # __update_col_stats                                                    #
+    #-----------------------------------------------------------------------#
+    def __update_col_stats(self, idx, col, col_width):
+        '''Record one data cell in the statistics for column idx.
+
+        Empty cells are skipped so that sparse columns are judged by the
+        cells that actually contain data. The width histogram is only
+        kept for width_percentile and the numeric check is only run for
+        auto_justify.
+        '''
+        while len(self.cols_stats) <= idx:
+            self.cols_stats.append({'cells': 0, 'numeric': 0, 'widths': {}})
+        if not col_width:
+            return
+        stats = self.cols_stats[idx]
+        stats['cells'] += 1
+        if self.width_percentile:
+            widths = stats['widths']
+            widths[col_width] = widths.get(col_width, 0) + 1
+        if self.auto_justify:
+            if ',' in col:
+                if RE_THOUSANDS.match(col.strip()):
+                    stats['numeric'] += 1
+            elif RE_NUMBER.match(col):
+                stats['numeric'] += 1
+
+    #-----------------------------------------------------------------------#
+    # __col_is_numeric                                                      #
+    #-----------------------------------------------------------------------#
+    def __col_is_numeric(self, idx):
+        '''True if every non-empty data cell in column idx is a number.'''
+        if idx >= len(self.cols_stats):
+            return False
+        stats = self.cols_stats[idx]
+        return stats['cells'] > 0 and stats['numeric'] == stats['cells']
+
+    #-----------------------------------------------------------------------#
+    # __col_width_percentile                                                #
+    #-----------------------------------------------------------------------#
+    def __col_width_percentile(self, idx, percentile):
+        '''Return the given percentile of the cell widths in column idx,
+        or 0 if the column has no non-empty data cells.'''
+        if idx >= len(self.cols_stats) or not self.cols_stats[idx]['cells']:
+            return 0
+        stats = self.cols_stats[idx]
+        target = stats['cells'] * percentile / 100.0
+        seen = 0
+        for width in sorted(stats['widths']):
+            seen += stats['widths'][width]
+            if seen >= target:
+                return width
+        return max(stats['widths'])
+
+    #-----------------------------------------------------------------------#
+    # __cap_col_widths                                                      #
+    #-----------------------------------------------------------------------#
+    def __cap_col_widths(self):
+        '''Cap column widths at width_percentile and/or max_width, then
+        truncate or wrap any cell that no longer fits.
+
+        Without this, a single huge cell sets the width of its column,
+        and therefore the width of every row in the table.
+        '''
+        if not self.width_percentile and not self.max_width:
+            return
+        nr_cols = min(self.last_col_idx + 1, len(self.cols_max_width))
+        # Headers are never truncated, so they set the minimum width.
+        floors = [1] * nr_cols
+        if self.header:
+            for i in range(nr_cols):
+                floors[i] = max(1, len(self.rows[0][i].decode('utf-8')))
+        caps = self.cols_max_width[:nr_cols]
+        # A cut number is a wrong number, so numeric columns are never
+        # capped by percentile and are the last to shrink for max_width.
+        numeric = [self.__col_is_numeric(i) for i in range(nr_cols)]
+        if self.width_percentile:
+            for i in range(nr_cols):
+                if numeric[i]:
+                    continue
+                width = self.__col_width_percentile(i, self.width_percentile)
+                if width:
+                    caps[i] = min(caps[i], max(width, floors[i]))
+        if self.max_width:
+            # Same arithmetic as __compute_width().
+            if self.no_borders:
+                overhead = len(self.nb_pad) * (nr_cols - 1)
+            else:
+                overhead = 2 + self.last_col_idx + nr_cols * (
+                    len(self.lpad) + len(self.rpad))
+            # __compute_width() widens the table to fit the title anyway,
+            # so don't truncate cells to save space the title will use.
+            max_width = max(self.max_width, len(self.lpad) +
+                len(self.title) + len(self.rpad) + 2)
+            excess = overhead + sum(caps) - max_width
+            # Narrow the widest column one character at a time so that
+            # wide columns give up space before narrow ones.
+            while excess > 0:
+                shrinkable = [c for c in range(nr_cols)
+                    if caps[c] > floors[c] and not numeric[c]]
+                if not shrinkable:
+                    shrinkable = [c for c in range(nr_cols)
+                        if caps[c] > floors[c]]
+                if not shrinkable:
+                    break
+                i = max(shrinkable, key=lambda c: caps[c])
+                caps[i] -= 1
+                excess -= 1
+        if caps == self.cols_max_width[:nr_cols]:
+            return
+        rows = []
+        rows_props = []
+        for nr, row in enumerate(self.rows):
+            if row[0] == '__LINE_SEPARATOR__' or (nr == 0 and self.header):
+                rows.append(row)
+                rows_props.append(self.rows_props[nr])
+                continue
+            for row_new in self.__fit_row(row, caps):
+                rows.append(row_new)
+                rows_props.append(self.rows_props[nr])
+        self.rows = rows
+        self.rows_props = rows_props
+        self.cols_max_width[:nr_cols] = caps
+
+    #-----------------------------------------------------------------------#
+    # __fit_row                                                             #
+    #-----------------------------------------------------------------------#
+    def __fit_row(self, row, caps):
+        '''Return a list of one or more rows made from row such that no
+        cell is wider than its column's cap. Truncated cells end with
+        self.ellipsis; wrapped cells continue on additional rows.'''
+        cells = []
+        for i, col in enumerate(row):
+            text = col.decode('utf-8')
+            if i >= len(caps) or len(text) <= caps[i]:
+                cells.append([col])
+            elif self.overflow == 'wrap':
+                # Break at whitespace; only unbroken runs longer than
+                # the cap are cut mid-word.
+                cells.append([line.encode('utf-8')
+                    for line in textwrap.wrap(text, caps[i]) or [u'']])
+            else:
+                cells.append([(text[:caps[i] - 1] +
+                    self.ellipsis).encode('utf-8')])
+        return [[lines[k] if k < len(lines) else '' for lines in cells]
+            for k in range(max(len(lines) for lines in cells))]
+
     #-----------------------------------------------------------------------#
     # __compute_last_col_idx                                                #
     #-----------------------------------------------------------------------#
@@ -588,7 +870,10 @@ class ConsoleTable(object):
             if len(self.cols_props) < i + 1:
                 self.cols_props.append({})
             if 'justify' not in self.cols_props[i]:
-                self.cols_props[i]['justify'] = DEF_COL_PROP_JUSTIFY
+                if self.auto_justify and self.__col_is_numeric(i):
+                    self.cols_props[i]['justify'] = 'right'
+                else:
+                    self.cols_props[i]['justify'] = DEF_COL_PROP_JUSTIFY
 
     #-----------------------------------------------------------------------#
     # __draw_row                                                            #
@@ -631,18 +916,37 @@ class ConsoleTable(object):
 #             print '[' + row_formatted + ']'
         return row_formatted
 
+    #-----------------------------------------------------------------------#
+    # __terminal_width                                                      #
+    #-----------------------------------------------------------------------#
+    def __terminal_width(self):
+        '''Width of the terminal on stdout, else $COLUMNS, else 0.'''
+        try:
+            import fcntl, struct, termios
+            return struct.unpack('hh', fcntl.ioctl(sys.stdout.fileno(),
+                termios.TIOCGWINSZ, '1234'))[1]
+        except Exception:
+            try:
+                return int(os.environ.get('COLUMNS', 0))
+            except ValueError:
+                return 0
+
     #-----------------------------------------------------------------------#
     # nr_rows                                                               #
     #-----------------------------------------------------------------------#
     def nr_rows(self):
-        return len(self.rows) - (1 if self.header else 0)
+        # Count rows buffered by add_row_concurrent() without merging
+        # them; merging early would fix the order of a partial set of
+        # rows. Each buffered row counts once, even if it has newlines.
+        with self.__buffers_lock:
+            buffered = sum(len(buf) for buf in self.__buffers)
+        return len(self.rows) - (1 if self.header else 0) + buffered
 
 #---------------------------------------------------------------------------#
 # main                                                                      #
 #---------------------------------------------------------------------------#
 if __name__ == '__main__':
     '''If this module is called directly, it produces a short sample.'''
-    import textwrap
     # See constructor above for all possible arguments.
     t = ConsoleTable(
         title='Sample ConsoleTable ©',
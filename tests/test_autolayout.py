@@ -0,0 +1,193 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#---------------------------------------------------------------------------#
+# Tests for ConsoleTable's auto-layout options: auto_justify,               #
+# width_percentile, max_width, and overflow.                                #
+#                                                                           #
+# Run from the top of the repository:                                       #
+#     python tests/test_autolayout.py                                       #
+#---------------------------------------------------------------------------#
+
+import os
+import sys
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..'))
+from rae.consoletable import ConsoleTable
+
+#---------------------------------------------------------------------------#
+# draw_lines                                                                #
+#---------------------------------------------------------------------------#
+def draw_lines(t):
+    '''Draw t and return its lines as unicode.'''
+    return t.draw().decode('utf-8').split('\n')
+
+#---------------------------------------------------------------------------#
+# TestAutoLayout                                                            #
+#---------------------------------------------------------------------------#
+class TestAutoLayout(unittest.TestCase):
+
+    def assertExits(self, **kwargs):
+        '''Constructing a table with kwargs writes to stderr and exits 1.'''
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            with self.assertRaises(SystemExit) as cm:
+                ConsoleTable(**kwargs)
+            self.assertIn('ConsoleTable: Invalid value', sys.stderr.getvalue())
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_invalid_options(self):
+        self.assertExits(width_percentile='95%')
+        self.assertExits(width_percentile=101)
+        self.assertExits(width_percentile=-1)
+        self.assertExits(max_width=-1)
+        self.assertExits(max_width='abc')
+        self.assertExits(auto_justify='no')
+        self.assertExits(overflow='clip')
+
+    def test_options_from_strings(self):
+        t = ConsoleTable(width_percentile='95', max_width='40')
+        self.assertEqual(t.width_percentile, 95)
+        self.assertEqual(t.max_width, 40)
+
+    def test_no_stats_by_default(self):
+        t = ConsoleTable(max_width=40)
+        t.add_row(['abc', '123'])
+        self.assertEqual(t.cols_stats, [])
+
+    def test_percentile_nearest_rank(self):
+        t = ConsoleTable(width_percentile=50)
+        for width in (2, 2, 2, 3, 9):
+            t.add_row(['x' * width])
+        percentile = t._ConsoleTable__col_width_percentile
+        self.assertEqual(percentile(0, 1), 2)
+        self.assertEqual(percentile(0, 60), 2)
+        self.assertEqual(percentile(0, 61), 3)
+        self.assertEqual(percentile(0, 80), 3)
+        self.assertEqual(percentile(0, 81), 9)
+        self.assertEqual(percentile(0, 100), 9)
+        # Columns with no data cells have no percentile.
+        self.assertEqual(percentile(1, 50), 0)
+
+    def test_percentile_caps_outlier(self):
+        t = ConsoleTable(width_percentile=95)
+        for n in range(19):
+            t.add_row(['host%d' % (n % 10), 'abcde'])
+        t.add_row(['big', 'x' * 1000])
+        lines = draw_lines(t)
+        self.assertEqual(t.cols_max_width[1], 5)
+        self.assertIn(u'│ big   │ xxxx… │', lines)
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+
+    def test_max_width_exact(self):
+        for width in (17, 20, 25, 31):
+            t = ConsoleTable(max_width=width)
+            t.add_row(['a' * 30, 'b' * 12, 'c' * 3])
+            t.add_row(['d', 'e' * 40, 'f'])
+            for line in draw_lines(t):
+                self.assertEqual(len(line), width)
+
+    def test_max_width_ascii_no_borders(self):
+        t = ConsoleTable(max_width=12, no_borders=True, nb_pad=' ')
+        t.add_row(['a' * 30, 'b' * 30])
+        for line in draw_lines(t):
+            self.assertEqual(len(line), 12)
+            self.assertTrue(line.endswith('~'))
+
+    def test_header_never_truncated(self):
+        t = ConsoleTable(header=('a long header', 'b'), max_width=10)
+        t.add_row(['x' * 40, 'y' * 40])
+        lines = draw_lines(t)
+        self.assertIn(u'a long header', lines[1])
+        self.assertEqual(t.cols_max_width[0], len('a long header'))
+        self.assertEqual(t.rows[0], ['a long header', 'b'])
+
+    def test_title_wider_than_max_width(self):
+        t = ConsoleTable('t' * 25, max_width=20)
+        t.add_row(['a' * 20, 'b'])
+        lines = draw_lines(t)
+        self.assertEqual(t.rows[0], ['a' * 20, 'b'])
+        self.assertFalse([line for line in lines if u'…' in line])
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+
+    def test_wrap_keeps_props_and_words(self):
+        t = ConsoleTable(max_width=21, overflow='wrap')
+        t.add_row(['1', 'costs 1,024 dollars per unit'], {'color': '31'})
+        t.add_row(['2', 'x' * 30])
+        draw_lines(t)
+        self.assertEqual(t.rows, [
+            ['1', 'costs 1,024'],
+            ['', 'dollars per'],
+            ['', 'unit'],
+            ['2', 'x' * 13],
+            ['', 'x' * 13],
+            ['', 'x' * 4],
+        ])
+        self.assertEqual(t.rows_props,
+            [{'color': '31'}] * 3 + [None] * 3)
+
+    def test_wrap_with_line_separators(self):
+        t = ConsoleTable(max_width=12, overflow='wrap', line_separators=True)
+        t.add_row(['one two three'])
+        t.add_row(['four'])
+        draw_lines(t)
+        # __pad_columns() pads rows to the separator's two entries.
+        self.assertEqual(t.rows, [
+            ['one two', ''], ['three', ''],
+            ['__LINE_SEPARATOR__', 'single'],
+            ['four', ''],
+        ])
+
+    def test_numeric_detection(self):
+        for cells, justify in (
+                (['1,024', '-12,345.67', '7', '3.5', '.5', '1e6'], 'right'),
+                (['1,2,3', '7'], 'left'),
+                ([',,,5', '7'], 'left'),
+                (['12,34', '7'], 'left'),
+                (['nan', '7'], 'left'),
+                (['inf'], 'left'),
+                (['1.2.3'], 'left')):
+            t = ConsoleTable(auto_justify=True)
+            for cell in cells:
+                t.add_row([cell])
+            draw_lines(t)
+            self.assertEqual(t.cols_props[0]['justify'], justify, cells)
+
+    def test_auto_justify_respects_set_col_property(self):
+        t = ConsoleTable(auto_justify=True)
+        t.set_col_property(1, {'justify': 'center'})
+        t.add_row(['1', '2'])
+        t.add_row(['10', '20'])
+        draw_lines(t)
+        self.assertEqual(t.cols_props[0]['justify'], 'center')
+        self.assertEqual(t.cols_props[1]['justify'], 'right')
+
+    def test_numbers_never_cut_by_percentile(self):
+        t = ConsoleTable(auto_justify=True, width_percentile=50)
+        for cell in ('1', '22', '1,024', '333333', '7'):
+            t.add_row([cell])
+        lines = draw_lines(t)
+        self.assertIn(u'│ 333333 │', lines)
+        self.assertIn(u'│  1,024 │', lines)
+
+    def test_max_width_shrinks_numbers_last(self):
+        t = ConsoleTable(auto_justify=True, max_width=20)
+        t.add_row(['a' * 20, '1234567890'])
+        lines = draw_lines(t)
+        self.assertIn(u'│ aa… │ 1234567890 │', lines)
+
+#---------------------------------------------------------------------------#
+# main                                                                      #
+#---------------------------------------------------------------------------#
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+#---------------------------------------------------------------------------#
+# Stress tests for ConsoleTable.add_row_concurrent().                       #
+#                                                                           #
+# Run from the top of the repository:                                       #
+#     python tests/test_concurrent.py                                       #
+#---------------------------------------------------------------------------#
+
+import os
+import random
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..'))
+from rae.consoletable import ConsoleTable
+
+NR_THREADS = 8
+NR_ROWS = 300
+
+#---------------------------------------------------------------------------#
+# TestAddRowConcurrent                                                      #
+#---------------------------------------------------------------------------#
+class TestAddRowConcurrent(unittest.TestCase):
+
+    def setUp(self):
+        # Switch threads as often as possible to maximize contention.
+        if hasattr(sys, 'setcheckinterval'):
+            self.check_interval = sys.getcheckinterval()
+            sys.setcheckinterval(1)
+        else:
+            self.switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        if hasattr(sys, 'setcheckinterval'):
+            sys.setcheckinterval(self.check_interval)
+        else:
+            sys.setswitchinterval(self.switch_interval)
+
+    def test_nr_rows_does_not_fix_order(self):
+        t = ConsoleTable()
+        t.add_row_concurrent(['b'], key=2)
+        self.assertEqual(t.nr_rows(), 1)
+        t.add_row_concurrent(['a'], key=1)
+        self.assertEqual(t.nr_rows(), 2)
+        t.draw()
+        self.assertEqual(t.rows, [['a'], ['b']])
+
+    def test_unkeyed_rows_keep_arrival_order(self):
+        t = ConsoleTable()
+        for n in range(10):
+            t.add_row_concurrent([str(n)])
+        t.draw()
+        self.assertEqual([row[0] for row in t.rows],
+            [str(n) for n in range(10)])
+
+    def test_stress(self):
+        t = ConsoleTable(header=('thread', 'n', 'data'))
+        start = threading.Event()
+        # One entry per thread: the widest cell each thread produced.
+        widest = [[0, 0, 0] for i in range(NR_THREADS)]
+        counts = []
+
+        def produce(tid):
+            rnd = random.Random(tid)
+            start.wait()
+            for n in range(NR_ROWS):
+                data = 'x' * rnd.randint(0, 30)
+                if tid == 3 and n == NR_ROWS // 2:
+                    data = 'y' * 60
+                row = ['t%d' % tid, str(n), data]
+                for i, col in enumerate(row):
+                    widest[tid][i] = max(widest[tid][i], len(col))
+                t.add_row_concurrent(row, key=(n, tid))
+                if tid == 0 and n % 50 == 0:
+                    counts.append(t.nr_rows())
+
+        threads = [threading.Thread(target=produce, args=(tid,))
+            for tid in range(NR_THREADS)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(t.nr_rows(), NR_THREADS * NR_ROWS)
+        self.assertEqual(counts, sorted(counts))
+        lines = t.draw().decode('utf-8').split('\n')
+        rows = t.rows[1:]
+
+        # No lost or duplicated rows, rendered or otherwise.
+        self.assertEqual(len(rows), NR_THREADS * NR_ROWS)
+        # Header: north, header and double separators; data; south.
+        self.assertEqual(len(lines), NR_THREADS * NR_ROWS + 4)
+        keys = [(int(row[1]), int(row[0][1:])) for row in rows]
+        self.assertEqual(keys, sorted(
+            (n, tid) for n in range(NR_ROWS) for tid in range(NR_THREADS)))
+
+        # Widths match both the merged rows and what was produced.
+        for i in range(3):
+            self.assertEqual(t.cols_max_width[i],
+                max(len(row[i]) for row in t.rows))
+            self.assertEqual(t.cols_max_width[i], max(
+                [len(t.header[i])] + [w[i] for w in widest]))
+        self.assertEqual(t.cols_max_width[2], 60)
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+
+#---------------------------------------------------------------------------#
+# main                                                                      #
+#---------------------------------------------------------------------------#
+if __name__ == '__main__':
+    unittest.main()